@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from study_app_ocr import extract_text_layer, ocr_pdf, ocr_pdfs_batch, OCRTextIndex
+
+def ocr_batch(batch):
+    """OCR a batch of (question_number, pdf_path) pairs, falling back to one PDF at a time"""
+    try:
+        return ocr_pdfs_batch([pdf_path for _, pdf_path in batch])
+    except Exception as e:
+        print(f"Batch OCR failed ({e}), falling back to one PDF at a time")
+        texts = {}
+        for _, pdf_path in batch:
+            try:
+                texts[pdf_path] = ocr_pdf(pdf_path)
+            except Exception as e:
+                print(f"Error processing {os.path.basename(pdf_path)}: {e}")
+        return texts
+
+def build_question_index(questions_dir, index_file, batch_size=25, workers=None):
+    """
+    OCR every question PDF once and save the text to a single JSON index,
+    so the study app never has to run OCR while it is being used.
+    Batches run on `workers` threads (default: one per CPU).
+    """
+    with os.scandir(questions_dir) as entries:
+        pdf_files = [entry.path for entry in entries
+                     if entry.name.startswith("question_") and entry.name.endswith(".pdf")]
+    # Sort numerically by question number ("question_" prefix and ".pdf" suffix are fixed)
+    pdf_files.sort(key=lambda x: int(os.path.basename(x)[9:-4]))
+    print(f"Found {len(pdf_files)} question files in {questions_dir}")
+    
+    # Entries from a previous run whose PDF hasn't changed are kept
+    index = OCRTextIndex(index_file, flush_every=batch_size)
+    pending = [(int(os.path.basename(pdf_path)[9:-4]), pdf_path) for pdf_path in pdf_files]
+    pending = [(question_number, pdf_path) for question_number, pdf_path in pending
+               if index.get(question_number, pdf_path) is None]
+    
+    # PDFs with a usable embedded text layer skip OCR entirely
+    needs_ocr = []
+    for question_number, pdf_path in pending:
+        text = extract_text_layer(pdf_path)
+        if text is None:
+            needs_ocr.append((question_number, pdf_path))
+        else:
+            index.store(question_number, pdf_path, text)
+    pending = needs_ocr
+    print(f"{len(pending)} questions need OCR")
+    
+    # OCR in batches so Tesseract starts once per batch instead of once per page,
+    # one batch per thread (see _tesseract_page for why threads are enough)
+    batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        for batch, texts in zip(batches, executor.map(ocr_batch, batches)):
+            for question_number, pdf_path in batch:
+                if pdf_path in texts:
+                    index.store(question_number, pdf_path, texts[pdf_path])
+                    print(f"Indexed {os.path.basename(pdf_path)}")
+    
+    index.flush()
+    print(f"Wrote {len(index.entries)} questions to {index_file}")
+
+if __name__ == "__main__":
+    questions_directory = "all_questions"
+    
+    if not os.path.exists(questions_directory):
+        print(f"Error: Questions directory '{questions_directory}' not found")
+        exit(1)
+    
+    build_question_index(questions_directory, "ocr_index.json")
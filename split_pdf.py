@@ -3,24 +3,62 @@
 import PyPDF2
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from PyPDF2 import PdfReader, PdfWriter
 
+# PyMuPDF parses content streams in C and is much faster at text extraction;
+# fall back to PyPDF2 when it isn't installed
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+# Multiple choice option markers, compiled once since they are checked on every page
+_PAT_ABCD = re.compile(r'\b([ABCD])\.\s')
+
+# How much of the end of each page's text to scan for the options
+_OPTIONS_TAIL_CHARS = 1500
+
 def has_multiple_choice_options(text):
     """
     Check if the text contains all four multiple choice options: A., B., C., D.
     """
-    # Look for patterns like "A.", "B.", "C.", "D." in the text
-    pattern_a = r'\bA\.\s'
-    pattern_b = r'\bB\.\s'
-    pattern_c = r'\bC\.\s'
-    pattern_d = r'\bD\.\s'
+    # Cheap substring pre-check: pages missing any of the literal markers can't match
+    if not all(marker in text for marker in ("A.", "B.", "C.", "D.")):
+        return False
     
-    has_a = bool(re.search(pattern_a, text))
-    has_b = bool(re.search(pattern_b, text))
-    has_c = bool(re.search(pattern_c, text))
-    has_d = bool(re.search(pattern_d, text))
-    
-    return has_a and has_b and has_c and has_d
+    # Look for patterns like "A.", "B.", "C.", "D." in a single pass over the text,
+    # stopping as soon as all four have been seen
+    seen = set()
+    for match in _PAT_ABCD.finditer(text):
+        seen.add(match.group(1))
+        if len(seen) == 4:
+            return True
+    return False
+
+# Document opened once per worker process by _init_page_worker
+_worker_doc = None
+
+def _init_page_worker(input_file):
+    """
+    Open the input PDF once in each worker process.
+    """
+    global _worker_doc
+    _worker_doc = fitz.open(input_file) if fitz else PdfReader(input_file)
+
+def _extract_page_text(page_num):
+    """
+    Extract the text of one page in a worker process.
+    Returns (page_num, text, error) so failures can be reported by the caller.
+    """
+    try:
+        if fitz:
+            text = _worker_doc[page_num].get_text("text")
+        else:
+            text = _worker_doc.pages[page_num].extract_text()
+        return page_num, text, None
+    except Exception as e:
+        return page_num, None, str(e)
 
 def split_pdf_by_questions(input_file, output_folder):
     """
@@ -40,17 +78,19 @@ def split_pdf_by_questions(input_file, output_folder):
     # Find question start pages
     question_starts = []
     
-    for page_num in range(total_pages):
-        try:
-            page = reader.pages[page_num]
-            text = page.extract_text()
+    # Text extraction is CPU bound and independent per page, so spread it across processes
+    with ProcessPoolExecutor(initializer=_init_page_worker, initargs=(input_file,)) as executor:
+        # map() yields results in page order, so question_starts stays sorted
+        for page_num, text, error in executor.map(_extract_page_text, range(total_pages), chunksize=8):
+            if error is not None:
+                print(f"Error processing page {page_num + 1}: {error}")
+                continue
             
-            if has_multiple_choice_options(text):
+            # Options are listed together at the bottom of a question's first page, so only
+            # the end of the page text needs scanning
+            if has_multiple_choice_options(text[-_OPTIONS_TAIL_CHARS:]):
                 question_starts.append(page_num)
                 print(f"Found question start at page {page_num + 1}")
-        except Exception as e:
-            print(f"Error processing page {page_num + 1}: {e}")
-            continue
     
     print(f"Found {len(question_starts)} questions")
     
@@ -65,13 +105,20 @@ def split_pdf_by_questions(input_file, output_folder):
         # Create a new PDF writer for this question
         writer = PdfWriter()
         
-        # Add pages for this question
-        for page_num in range(start_page, end_page + 1):
-            try:
-                writer.add_page(reader.pages[page_num])
-            except Exception as e:
-                print(f"Error adding page {page_num + 1} to question {i + 1}: {e}")
-                continue
+        # Copy the question's page range from the shared reader in one call
+        try:
+            writer.append(reader, pages=(start_page, end_page + 1))
+        except Exception as e:
+            print(f"Error copying pages {start_page + 1}-{end_page + 1} to question {i + 1}: {e}")
+            
+            # Fall back to adding pages one at a time so a single bad page doesn't lose the question
+            writer = PdfWriter()
+            for page_num in range(start_page, end_page + 1):
+                try:
+                    writer.add_page(reader.pages[page_num])
+                except Exception as e:
+                    print(f"Error adding page {page_num + 1} to question {i + 1}: {e}")
+                    continue
         
         # Write the question PDF
         output_filename = f"question_{i + 1}.pdf"
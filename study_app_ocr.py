@@ -1,83 +1,681 @@
 import streamlit as st
 import os
+
+# Limit each Tesseract run to one core; parallelism comes from running one run per
+# core at once (see _ocr_slots). Set before tesserocr is imported below, since OpenMP
+# reads it once when libtesseract loads.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
 import re
-import glob
 from pathlib import Path
 import pytesseract
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
 import tempfile
 import json
 import base64
+import hashlib
+import io
+import shutil
+import subprocess
+import atexit
+import contextlib
+import threading
+import queue
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# PyMuPDF reads a PDF's text layer with its line layout intact, which the choice parser
+# needs (PyPDF2 runs the lines together), so text-layer extraction is skipped without it
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+# tesserocr calls libtesseract in-process, avoiding a tesseract subprocess and model
+# load per page; fall back to pytesseract when it isn't installed
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# RE2 matches in guaranteed linear time whatever the OCR produced; the wrong-choice
+# pattern below is RE2-compatible, so use it when google-re2 is installed
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# fcntl locks keep writers in different processes (several app servers, or build_index.py
+# next to the app) from interleaving; it only exists on POSIX
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# orjson (de)serializes several times faster than the standard library; fall back to
+# json when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Page markers, removed before any other cleanup
+_PAGE_MARKER_RE = re.compile(r'--- Page \d+ ---')
+
+# Common OCR misreads, fixed in a single scan. Each branch sees the raw text, so
+# the context classes account for the other fixes: a '|' becomes the letter I,
+# and a zero after a letter becomes lowercase o.
+_OCR_FIX_RE = re.compile(
+    r'(?P<pipe>\|)'  # Vertical bars often misread as I
+    r'|(?P<rn>rn)'  # Common OCR error
+    r'|(?P<O>0(?=[A-Za-z|]))'  # Zero misread as O before letters
+    r'|(?P<o>0(?<=[A-Za-z|]0))'  # ... or as o after letters
+    r'|(?P<l>1(?=[a-z])(?:(?<=[a-z]1)|(?<=[A-Za-z|]01)))'  # 1 misread as l
+)
+_OCR_FIXES = {'pipe': 'I', 'rn': 'm', 'O': 'O', 'o': 'o', 'l': 'l'}
+
+# Missing space after sentence punctuation, fixed once whitespace is collapsed
+_SENTENCE_SPACING_RE = re.compile(r'([.!?])([A-Z])')
+
+# A wrong choice reference in an explanation, e.g. "(Choice A)", "(Choices B & C)",
+# "(Choices A, B, & D)"; group 1 is the list of letters
+_WRONG_CHOICE_RE = (re2 or re).compile(
+    r'(?i)\(Choices?\s+([A-D](?:\s*(?:,|&|and)\s*[A-D]|\s*,\s*(?:&|and)\s*[A-D])*)\)')
+_CHOICE_LIST_SEP_RE = re.compile(r'[,&]|\band\b', re.IGNORECASE)
+
+def _json_loads(data):
+    """Parse JSON text or bytes, with orjson when available"""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def _json_dumps(data):
+    """Serialize to compact UTF-8 JSON bytes, with orjson when available"""
+    if orjson:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+@contextlib.contextmanager
+def _file_lock(path):
+    """Hold an exclusive lock on path's sidecar .lock file for the duration of the block"""
+    with open(path + ".lock", 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+def _replace_file(path, data):
+    """Atomically replace a file with data (bytes), synced to disk before the swap"""
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+# Characters not allowed in a user's answers filename
+_UNSAFE_FILENAME_CHARS_RE = re.compile(r'[^\w\-_\.]')
+
+def _parse_question_and_choices(text):
+    """
+    Split the question part of the OCR text into the question lines and the
+    choices in one pass over its lines. Returns (question_lines, choices), where
+    choices maps each option letter to its text re-joined onto one line.
+    """
+    question_lines = []
+    in_question = True
+    choices = {}
+    letter = None
+    choice_lines = []
+    
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        
+        # Plain string checks rather than a regex per line: an option marker is
+        # "A." to "D." at the start of the line
+        is_marker = line[0] in "ABCD" and line[1:2] == '.'
+        
+        # The question ends at the first choice line ("A." alone or followed by its text)
+        if in_question:
+            if is_marker and (len(line) == 2 or line[2].isspace()):
+                in_question = False
+            else:
+                question_lines.append(line)
+        
+        # Each option runs from its marker line to the next one
+        if is_marker:
+            if letter:
+                _add_choice(choices, letter, choice_lines)
+            letter = line[0]
+            choice_lines = [line[2:].strip()]
+        elif letter:
+            choice_lines.append(line)
+    
+    if letter:
+        _add_choice(choices, letter, choice_lines)
+    return question_lines, choices
+
+def _add_choice(choices, letter, lines):
+    """Record an option's text unless it is too short to be real"""
+    choice_content = ' '.join(line for line in lines if line)
+    if len(choice_content) > 3:
+        choices[letter] = choice_content
+
+# Tesseract runtime scales with pixel count; 200 dpi is enough for these clean printed
+# pages, with a full-resolution retry for the rare page where the choices get lost
+OCR_DPI = 200
+OCR_RETRY_DPI = 300
+# LSTM engine only, uniform text block, and skip the inverted-text pass
+TESSERACT_CONFIG = '--oem 1 --psm 6 -c tessedit_do_invert=0'
+
+def _has_choices(text):
+    """Check that OCR text has enough answer choices to be usable"""
+    return len(_parse_question_and_choices(text.partition("Explanation:")[0])[1]) >= 2
+
+def _can_rasterize():
+    """Check that PDF pages can be rendered for OCR, in-process or with poppler"""
+    return fitz is not None or shutil.which('pdftoppm') is not None
+
+def _rasterize(pdf_path, output_dir, prefix="page", dpi=OCR_DPI):
+    """
+    Render every page of a PDF to an 8-bit grayscale PGM and return the image paths
+    in page order. Tesseract reads these directly, so no pixels pass through PIL.
+    """
+    output_prefix = os.path.join(output_dir, prefix)
+    if fitz:
+        # MuPDF renders in-process, saving a pdftoppm process (and a re-parse of the PDF) per file
+        with fitz.open(pdf_path) as doc:
+            width = len(str(len(doc)))
+            image_paths = []
+            for page in doc:
+                image_path = f"{output_prefix}-{page.number + 1:0{width}d}.pgm"
+                page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).save(image_path)
+                image_paths.append(image_path)
+        return image_paths
+    
+    subprocess.run(['pdftoppm', '-gray', '-r', str(dpi), pdf_path, output_prefix],
+                   capture_output=True, check=True)
+    # pdftoppm zero-pads page numbers to a common width, so a plain sort is page order
+    return sorted(entry.path for entry in os.scandir(output_dir)
+                  if entry.name.startswith(prefix + "-") and entry.name.endswith(".pgm"))
+
+@st.cache_resource(show_spinner=False)
+def _ocr_slots():
+    """
+    One Tesseract run per core across the whole process. Page threads, the prewarm pool,
+    the prefetch pool and foreground OCR all nest or overlap, so each run takes a slot.
+    """
+    return threading.BoundedSemaphore(os.cpu_count() or 1)
+
+@st.cache_resource(show_spinner=False)
+def _tesseract_api_pool():
+    """Idle tesserocr APIs, kept for the life of the server process so models load once"""
+    return queue.SimpleQueue()
+
+def _new_tesseract_api():
+    """A tesserocr API set up like TESSERACT_CONFIG"""
+    api = tesserocr.PyTessBaseAPI(lang='eng', psm=tesserocr.PSM.SINGLE_BLOCK, oem=tesserocr.OEM.LSTM_ONLY)
+    api.SetVariable("tessedit_do_invert", "0")
+    return api
+
+# Distinct page images whose OCR text is kept; a few KB of text each. Pages whose PDF is
+# already in the OCR index are never OCR'd again, so older entries are rarely needed.
+PAGE_TEXT_CACHE_SIZE = 4096
+
+@st.cache_resource(show_spinner=False)
+def _page_text_cache():
+    """OCR text by digest of the rendered page image (least recently used first), and its lock"""
+    return OrderedDict(), threading.Lock()
+
+def _ocr_page(image_path):
+    """Extract the text of one rendered page using OCR, once per distinct page image"""
+    # Hashing a page takes milliseconds against a second or more of OCR, and pages
+    # that render identically (repeated boilerplate) then share one Tesseract run
+    with open(image_path, 'rb') as f:
+        digest = hashlib.blake2b(f.read(), digest_size=16).digest()
+    cache, lock = _page_text_cache()
+    with lock:
+        text = cache.get(digest)
+        if text is not None:
+            cache.move_to_end(digest)
+            return text
+    
+    text = _tesseract_page(image_path)
+    with lock:
+        cache[digest] = text
+        if len(cache) > PAGE_TEXT_CACHE_SIZE:
+            cache.popitem(last=False)
+    return text
+
+def _tesseract_page(image_path):
+    """Run Tesseract on one rendered page, waiting for a free OCR slot"""
+    # OCR callers use threads rather than processes: pytesseract waits on a tesseract
+    # subprocess, and tesserocr releases the GIL while libtesseract works on the image
+    with _ocr_slots():
+        if not tesserocr:
+            return pytesseract.image_to_string(image_path, lang='eng', config=TESSERACT_CONFIG)
+        
+        # An API can only work on one image at a time, so each call borrows an idle one
+        pool = _tesseract_api_pool()
+        try:
+            api = pool.get_nowait()
+        except queue.Empty:
+            api = _new_tesseract_api()
+        try:
+            api.SetImageFile(image_path)
+            return api.GetUTF8Text()
+        finally:
+            pool.put(api)
+
+def ocr_pdf(pdf_path, dpi=OCR_DPI):
+    """Run OCR over every page of a PDF and return the combined text"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_paths = _rasterize(pdf_path, tmp_dir, dpi=dpi)
+        # Each page is a separate single-threaded Tesseract run, so OCR them all at
+        # once; _ocr_slots caps how many run at a time across all callers
+        workers = max(1, min(len(image_paths), os.cpu_count() or 1))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            all_text = "".join(text + "\n" for text in executor.map(_ocr_page, image_paths))
+    
+    if dpi < OCR_RETRY_DPI and not _has_choices(all_text):
+        return ocr_pdf(pdf_path, dpi=OCR_RETRY_DPI)
+    
+    return all_text
+
+# Born-digital PDFs average well over this many characters of embedded text per page;
+# scanned ones have next to none
+MIN_TEXT_LAYER_CHARS = 100
+
+def extract_text_layer(pdf_path):
+    """
+    Return a PDF's embedded text when it can stand in for OCR (enough text per page,
+    and the answer choices parse out of it), otherwise None.
+    """
+    if not fitz:
+        return None
+    try:
+        with fitz.open(pdf_path) as doc:
+            pages = [page.get_text("text") for page in doc]
+    except Exception:
+        return None
+    
+    if not pages or sum(len(page.strip()) for page in pages) < MIN_TEXT_LAYER_CHARS * len(pages):
+        return None
+    # Same layout as ocr_pdf, a newline after each page
+    text = "".join(page + "\n" for page in pages)
+    return text if _has_choices(text) else None
+
+def pdf_to_text(pdf_path):
+    """Get a PDF's text from its text layer when usable, falling back to OCR"""
+    text = extract_text_layer(pdf_path)
+    return text if text is not None else ocr_pdf(pdf_path)
+
+def ocr_pdfs_batch(pdf_paths):
+    """
+    OCR several PDFs with a single Tesseract run over an image list, so Tesseract's
+    startup cost is paid once per batch rather than once per page.
+    Returns {pdf_path: text} in the same format as ocr_pdf.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        page_counts = []
+        image_paths = []
+        for n, pdf_path in enumerate(pdf_paths):
+            pages = _rasterize(pdf_path, tmp_dir, prefix=f"pdf{n}")
+            page_counts.append(len(pages))
+            image_paths.extend(pages)
+        
+        image_list = os.path.join(tmp_dir, "imagelist.txt")
+        with open(image_list, 'w') as f:
+            f.write("\n".join(image_paths) + "\n")
+        
+        output_base = os.path.join(tmp_dir, "out")
+        with _ocr_slots():
+            subprocess.run(['tesseract', image_list, output_base, '-l', 'eng'] + TESSERACT_CONFIG.split(),
+                           capture_output=True, check=True)
+        with open(output_base + ".txt", 'r', encoding='utf-8') as f:
+            output = f.read()
+    
+    # Tesseract ends every page with a form feed
+    page_texts = output.split("\f")[:-1]
+    if len(page_texts) != len(image_paths):
+        raise RuntimeError(f"Expected {len(image_paths)} pages of OCR output, got {len(page_texts)}")
+    
+    results = {}
+    start = 0
+    for pdf_path, count in zip(pdf_paths, page_counts):
+        # Same layout as ocr_pdf, which appends a newline after each page's output
+        results[pdf_path] = "".join(text + "\f\n" for text in page_texts[start:start + count])
+        start += count
+        
+        if not _has_choices(results[pdf_path]):
+            results[pdf_path] = ocr_pdf(pdf_path, dpi=OCR_RETRY_DPI)
+    return results
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _list_pdf_files(questions_dir, dir_mtime_ns):
+    """
+    List question PDFs in a directory, sorted numerically (cached until the directory
+    changes). Shared rather than copied per rerun, so callers must not modify it.
+    """
+    with os.scandir(questions_dir) as entries:
+        names = [entry.name for entry in entries
+                 if entry.name.startswith("question_") and entry.name.endswith(".pdf")]
+    # Sort numerically by question number ("question_" prefix and ".pdf" suffix are fixed)
+    names.sort(key=lambda name: int(name[9:-4]))
+    return [os.path.join(questions_dir, name) for name in names]
+
+class OCRTextIndex:
+    """OCR text for each question PDF, persisted to a JSON file so OCR only ever runs once per PDF"""
+    
+    def __init__(self, index_file, flush_every=10):
+        self.index_file = index_file
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.unsaved = 0
+        self.entries = self.load()
+    
+    def load(self):
+        """Load the index file, or start empty if it is missing or unreadable"""
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'rb') as f:
+                entries = _json_loads(f.read())
+        except (ValueError, OSError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+    
+    def get(self, question_number, pdf_path):
+        """Get the OCR text for a question, or None if missing or the PDF has changed"""
+        entry = self.entries.get(f"Question_{question_number}")
+        # File size rather than mtime, since mtimes are reset by a fresh git checkout
+        if not isinstance(entry, dict) or entry.get("size") != os.path.getsize(pdf_path):
+            return None
+        return entry.get("raw_text")
+    
+    def store(self, question_number, pdf_path, raw_text):
+        """Record the OCR text for a question, writing the file every flush_every stores"""
+        with self.lock:
+            self.entries[f"Question_{question_number}"] = {
+                "file": os.path.basename(pdf_path),
+                "size": os.path.getsize(pdf_path),
+                "raw_text": raw_text
+            }
+            self.unsaved += 1
+            if self.unsaved >= self.flush_every:
+                self._write()
+    
+    def flush(self):
+        """Write any unsaved entries to the index file"""
+        with self.lock:
+            if self.unsaved:
+                self._write()
+    
+    def _write(self):
+        # Locked across the read-merge-write, so concurrent writers can't drop each other's entries
+        with _file_lock(self.index_file):
+            # Keep entries written by another process (e.g. build_index.py) since we loaded
+            entries = self.load()
+            entries.update(self.entries)
+            self.entries = entries
+            
+            # Write to a temp file and swap it in, so readers never see a partial file
+            _replace_file(self.index_file, _json_dumps(self.entries))
+        self.unsaved = 0
+
+class AnswersStore:
+    """
+    An answers file (the shared correct answers, or one user's progress), kept in
+    memory and written in the background at most once every save_interval seconds.
+    In memory, data maps question number to a (correct_result, users_choice) tuple;
+    the file keeps its {"Question_N": {"Correct_result": ..., "Users_choice": ...}}
+    layout. Writes only replace the entries changed here, so other processes' answers
+    and hand edits survive.
+    """
+    
+    def __init__(self, answers_file, save_interval=2.0):
+        self.answers_file = answers_file
+        self.save_interval = save_interval
+        # lock guards the dirty flag and timer and is never held during file I/O, so
+        # save() doesn't wait on a write; write_lock serializes the writes themselves
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.dirty = False
+        self.last_save = 0.0
+        self.timer = None
+        self.data = self.load()
+        # The values as last read from or written to the file, to tell which ones changed here
+        self.saved = dict(self.data)
+    
+    def _read_file(self):
+        """The answers file's JSON object as is, or empty if it is missing or unreadable"""
+        if not os.path.exists(self.answers_file):
+            return {}
+        try:
+            with open(self.answers_file, 'rb') as f:
+                answers = _json_loads(f.read())
+        except (ValueError, OSError):
+            return {}
+        return answers if isinstance(answers, dict) else {}
+    
+    def load(self):
+        """Load the answers file, or start empty if it is missing or unreadable"""
+        data = {}
+        for key, entry in self._read_file().items():
+            # Skip anything that isn't a {"Question_N": {...}} entry rather than fail to load
+            if not key.startswith("Question_") or not key[9:].isdecimal() or not isinstance(entry, dict):
+                continue
+            data[int(key[9:])] = (entry.get("Correct_result"), entry.get("Users_choice"))
+        return data
+    
+    def save(self):
+        """Mark the answers as changed and schedule a write once the save interval allows"""
+        with self.lock:
+            self.dirty = True
+            # Always written from the timer thread, so a submit never waits on the rewrite and fsync
+            if self.timer is None:
+                wait = self.last_save + self.save_interval - time.time()
+                self.timer = threading.Timer(max(wait, 0.0), self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+    
+    def flush(self):
+        """Write the answers file if anything changed since the last write"""
+        with self.write_lock:
+            with self.lock:
+                self.timer = None
+                if not self.dirty:
+                    return
+                self.dirty = False
+                # A snapshot, since other sessions may add answers while the write runs
+                snapshot = dict(self.data)
+            try:
+                self._write(snapshot)
+            except Exception:
+                with self.lock:
+                    self.dirty = True
+                raise
+    
+    def _write(self, snapshot):
+        changed = {question_number: value for question_number, value in snapshot.items()
+                   if self.saved.get(question_number) != value}
+        
+        # Locked across the read-merge-write, so writers in other processes (or a hand
+        # edit) only lose entries that were also changed here
+        with _file_lock(self.answers_file):
+            answers = self._read_file()
+            for question_number, (correct_result, users_choice) in changed.items():
+                entry = {}
+                if correct_result is not None:
+                    entry["Correct_result"] = correct_result
+                if users_choice is not None:
+                    entry["Users_choice"] = users_choice
+                answers[f"Question_{question_number}"] = entry
+            _replace_file(self.answers_file, _json_dumps(answers))
+        self.saved.update(changed)
+        self.last_save = time.time()
+
+@st.cache_resource(show_spinner=False)
+def _get_answers_store(answers_file):
+    """One shared store per answers file per server process, so buffered writes survive reruns; flushed on exit"""
+    store = AnswersStore(answers_file)
+    atexit.register(store.flush)
+    return store
+
+@st.cache_resource(show_spinner=False)
+def _get_ocr_index(index_file):
+    """One shared OCR index per server process (not copied per rerun), flushed on exit"""
+    index = OCRTextIndex(index_file)
+    atexit.register(index.flush)
+    return index
+
+def _warm_ocr_cache(index, question_number, pdf_path):
+    """OCR a PDF into the shared index in the background, ignoring failures (it is retried on view)"""
+    try:
+        index.store(question_number, pdf_path, pdf_to_text(pdf_path))
+    except Exception:
+        pass
+
+@st.cache_resource(show_spinner=False)
+def _get_ocr_jobs():
+    """
+    Background OCR jobs (prewarm and prefetch) queued or running, as question number ->
+    (executor, future). Shared by all sessions, so each PDF has at most one job and
+    viewers can find it.
+    """
+    # Reentrant, since a job's done callback runs in the submitting thread if it has already finished
+    return {}, threading.RLock()
+
+def _submit_ocr_job(executor, index, question_number, pdf_path):
+    """
+    Queue background OCR of a question on executor, unless it already has a job. A job
+    still waiting in another pool (e.g. the long prewarm queue) is moved to this one.
+    """
+    jobs, lock = _get_ocr_jobs()
+    with lock:
+        if question_number in jobs:
+            job_executor, job = jobs[question_number]
+            if job_executor is executor or not job.cancel():
+                return
+        future = executor.submit(_warm_ocr_cache, index, question_number, pdf_path)
+        jobs[question_number] = (executor, future)
+        
+        def forget(done):
+            with lock:
+                if jobs.get(question_number, (None, None))[1] is done:
+                    del jobs[question_number]
+        future.add_done_callback(forget)
+
+@st.cache_resource(show_spinner=False)
+def _start_background_ocr(questions_dir, _app):
+    """Queue OCR of all un-indexed question PDFs on a small thread pool, once per server process"""
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ocr-prewarm")
+    for question_number, pdf_path in enumerate(_app.pdf_files, 1):
+        if _app.ocr_index.get(question_number, pdf_path) is None:
+            _submit_ocr_job(executor, _app.ocr_index, question_number, pdf_path)
+    return executor
+
+@st.cache_resource(show_spinner=False)
+def _get_prefetch_executor():
+    """Thread pool for OCR'ing the questions around the current one, shared by all sessions"""
+    return ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2), thread_name_prefix="ocr-prefetch")
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _read_pdf_bytes(pdf_path, mtime):
+    """PDF bytes for the viewer, read once per file version (immutable, so shared rather than copied)"""
+    with open(pdf_path, "rb") as pdf_file:
+        return pdf_file.read()
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _pdf_base64(pdf_path, mtime):
+    """Base64 of a PDF for data: URLs, encoded once per file version"""
+    return base64.b64encode(_read_pdf_bytes(pdf_path, mtime)).decode('utf-8')
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _render_preview_pages(pdf_path, mtime, dpi=150):
+    """
+    JPEG bytes of each page of a PDF for the image preview, rendered once per file version.
+    A tuple of immutable bytes, so it is shared rather than copied on every rerun.
+    """
+    pages = []
+    if fitz:
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                pages.append(page.get_pixmap(dpi=dpi).tobytes("jpeg", jpg_quality=80))
+        return tuple(pages)
+    
+    # Render one page at a time, so only one full page image is in memory
+    for page in range(1, pdfinfo_from_path(pdf_path)["Pages"] + 1):
+        image = convert_from_path(pdf_path, dpi=dpi, first_page=page, last_page=page)[0]
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=80)
+        pages.append(buffer.getvalue())
+    return tuple(pages)
+
+# Past this many questions the selector is split into pages, since the browser
+# slows down badly rendering and filtering a dropdown with thousands of options
+PAGED_SELECTOR_THRESHOLD = 200
+QUESTIONS_PER_PAGE = 50
 
 class StudyAppOCR:
     def __init__(self):
         self.questions_dir = "all_questions"
         self.pdf_files = self.get_pdf_files()
+        # Kept outside questions_dir: writing it there would change the directory's mtime,
+        # which the PDF listing is cached on
+        self.index_file = "ocr_index.json"
+        self.ocr_index = _get_ocr_index(self.index_file)
+        self.start_background_ocr()
         self.answers_file = "correct_answers.json"
         self.load_or_create_answers_file()
         self.init_session_state()
         
     def init_session_state(self):
-        """Initialize session state variables"""
-        if 'current_question' not in st.session_state:
-            st.session_state.current_question = 1
-        if 'show_explanation' not in st.session_state:
-            st.session_state.show_explanation = False
-        if 'ocr_cache' not in st.session_state:
-            st.session_state.ocr_cache = {}
-        if 'question_data_cache' not in st.session_state:
-            st.session_state.question_data_cache = {}
-        if 'current_user' not in st.session_state:
-            st.session_state.current_user = ""
-        if 'user_answers_file' not in st.session_state:
-            st.session_state.user_answers_file = ""
+        """Initialize session state variables (all of them, in one place)"""
+        state = st.session_state
+        state.setdefault('current_question_index', 0)
+        state.setdefault('user_answer', None)
+        state.setdefault('show_explanation', False)
+        state.setdefault('current_user', "")
+        state.setdefault('user_answers_file', "")
+        state.setdefault('status_cache', {})
+        state.setdefault('question_labels', [])
+        state.setdefault('question_page_index', None)
         
     def load_or_create_answers_file(self):
         """Load existing answers file or create a new one"""
-        if os.path.exists(self.answers_file):
-            try:
-                with open(self.answers_file, 'r') as f:
-                    self.answers_data = json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                self.answers_data = {}
-        else:
-            self.answers_data = {}
+        self.answers_store = _get_answers_store(self.answers_file)
+        self.answers_data = self.answers_store.data
+        if not os.path.exists(self.answers_file):
             self.save_answers_file()
     
     def save_answers_file(self):
-        """Save answers to JSON file"""
+        """Save answers to JSON file (batched; see AnswersStore)"""
         try:
-            with open(self.answers_file, 'w') as f:
-                json.dump(self.answers_data, f, indent=2)
+            self.answers_store.save()
         except Exception as e:
             st.error(f"Error saving answers file: {str(e)}")
     
     def get_stored_correct_answer(self, question_number):
         """Get correct answer from JSON file if available"""
-        question_key = f"Question_{question_number}"
-        return self.answers_data.get(question_key, {}).get("Correct_result", None)
+        return self.answers_data.get(question_number, (None, None))[0]
     
     def store_correct_answer(self, question_number, correct_answer):
         """Store correct answer in JSON file"""
-        question_key = f"Question_{question_number}"
-        if question_key not in self.answers_data:
-            self.answers_data[question_key] = {}
-        self.answers_data[question_key]["Correct_result"] = correct_answer
+        user_choice = self.answers_data.get(question_number, (None, None))[1]
+        self.answers_data[question_number] = (correct_answer, user_choice)
         self.save_answers_file()
     
     def store_user_choice(self, question_number, user_choice):
         """Store user's choice in JSON file"""
-        question_key = f"Question_{question_number}"
-        if question_key not in self.answers_data:
-            self.answers_data[question_key] = {}
-        self.answers_data[question_key]["Users_choice"] = user_choice
+        correct_answer = self.answers_data.get(question_number, (None, None))[0]
+        self.answers_data[question_number] = (correct_answer, user_choice)
         self.save_answers_file()
     
     def get_user_choice(self, question_number):
         """Get user's choice from JSON file if available"""
-        question_key = f"Question_{question_number}"
-        return self.answers_data.get(question_key, {}).get("Users_choice", None)
+        return self.answers_data.get(question_number, (None, None))[1]
     
     def get_question_status(self, question_number):
         """Get question status: 'correct', 'wrong', 'needs_answer'"""
@@ -93,279 +691,130 @@ class StudyAppOCR:
         else:
             return 'wrong'
         
+    def start_background_ocr(self):
+        """Pre-warm the OCR index for questions that aren't in it yet"""
+        if not _can_rasterize():
+            return
+        # Cached on the directory, so this only does work on the first run in the process
+        _start_background_ocr(self.questions_dir, self)
+    
+    def prefetch_questions(self, question_index, behind=1, ahead=3):
+        """OCR the questions around the current one in the background, so navigating to them is instant"""
+        if not _can_rasterize():
+            return
+        for i in range(max(0, question_index - behind), min(len(self.pdf_files), question_index + ahead + 1)):
+            question_number = i + 1
+            pdf_path = self.pdf_files[i]
+            if i != question_index and self.ocr_index.get(question_number, pdf_path) is None:
+                _submit_ocr_job(_get_prefetch_executor(), self.ocr_index, question_number, pdf_path)
+    
     def get_pdf_files(self):
         """Get all PDF files in the questions directory, sorted numerically"""
-        if not os.path.exists(self.questions_dir):
+        try:
+            dir_mtime_ns = os.stat(self.questions_dir).st_mtime_ns
+        except FileNotFoundError:
             return []
         
-        pdf_files = glob.glob(os.path.join(self.questions_dir, "question_*.pdf"))
-        # Sort numerically by question number
-        pdf_files.sort(key=lambda x: int(re.search(r'question_(\d+)\.pdf', x).group(1)))
-        return pdf_files
+        # Keyed on the directory's mtime, so newly split PDFs show up without a restart
+        return _list_pdf_files(self.questions_dir, dir_mtime_ns)
     
     def extract_text_from_pdf_ocr(self, pdf_path):
-        """Extract text from PDF using OCR"""
+        """Extract text from PDF, using OCR unless its embedded text layer is usable"""
         try:
-            # Check if poppler is available
-            import subprocess
-            try:
-                subprocess.run(['pdftoppm', '-h'], capture_output=True, check=True)
-            except (subprocess.CalledProcessError, FileNotFoundError):
+            # Born-digital PDFs don't need OCR (or poppler) at all
+            text = extract_text_layer(pdf_path)
+            if text is not None:
+                return text
+            
+            # Check that pages can be rendered (PyMuPDF, or poppler's pdftoppm)
+            if not _can_rasterize():
                 st.error("⚠️ OCR dependencies not available in deployment environment. Please install poppler-utils.")
                 st.info("💡 This app requires system dependencies that may not be available in all deployment environments.")
                 return None
             
-            # Convert PDF to images
-            images = convert_from_path(pdf_path, dpi=300)
-            
-            all_text = ""
-            for i, image in enumerate(images):
-                # Extract text using OCR
-                text = pytesseract.image_to_string(image, lang='eng', config='--psm 6')
-                all_text += text + "\n"
-            
-            return all_text
+            return ocr_pdf(pdf_path)
             
         except Exception as e:
             st.error(f"Error extracting text from {pdf_path}: {str(e)}")
             st.info("💡 If you're seeing this error in deployment, make sure poppler-utils is installed via packages.txt")
             return None
     
-    def parse_question_and_explanation(self, text):
-        """Parse the question and explanation from the OCR text"""
-        if not text:
-            return None, None
-        
-        # Clean up OCR artifacts
-        text = self.clean_ocr_text(text)
-        
-        # Split by "Explanation:" to separate question from explanation
-        parts = text.split("Explanation:")
-        question_part = parts[0].strip()
-        explanation_part = parts[1].strip() if len(parts) > 1 else "No explanation available."
-        
-        return question_part, explanation_part
-    
-    def clean_ocr_text(self, text):
+    @staticmethod
+    def clean_ocr_text(text):
         """Clean up common OCR artifacts and errors"""
         if not text:
             return text
         
-        # Remove page markers
-        text = re.sub(r'--- Page \d+ ---', '', text)
+        text = _PAGE_MARKER_RE.sub('', text)
+        text = _OCR_FIX_RE.sub(lambda m: _OCR_FIXES[m.lastgroup], text)
         
-        # Fix common OCR errors
-        text = re.sub(r'\|', 'I', text)  # Vertical bars often misread as I
-        text = re.sub(r'0(?=[A-Za-z])', 'O', text)  # Zero misread as O before letters
-        text = re.sub(r'(?<=[A-Za-z])0', 'o', text)  # Zero misread as o after letters
-        text = re.sub(r'rn', 'm', text)  # Common OCR error
-        text = re.sub(r'(?<=[a-z])1(?=[a-z])', 'l', text)  # 1 misread as l
-        
-        # Fix spacing issues
-        text = re.sub(r'\s+', ' ', text)  # Multiple spaces to single space
-        text = re.sub(r'\n\s*\n', '\n\n', text)  # Clean up line breaks
+        # Fix spacing issues: collapse all whitespace runs (str.split is cheaper than a regex)
+        text = ' '.join(text.split())
         
         # Fix sentence spacing
-        text = re.sub(r'([.!?])([A-Z])', r'\1 \2', text)
-        
-        return text.strip()
+        return _SENTENCE_SPACING_RE.sub(r'\1 \2', text)
     
-    def extract_choices_ocr(self, question_text):
-        """Extract multiple choice options from OCR text"""
-        choices = {}
-        
-        # Clean the text first
-        cleaned_text = self.clean_ocr_text(question_text)
-        
-        # Remove page markers if present
-        cleaned_text = re.sub(r'--- Page \d+ ---[^\n]*\n?', '', cleaned_text)
-        
-        # Split into lines for processing
-        lines = cleaned_text.split('\n')
-        
-        # Look for lines that start with A., B., C., D.
-        current_choice = None
-        current_text = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check if line starts with a choice pattern
-            choice_match = re.match(r'^([A-D])\.\s*(.*)', line)
-            if choice_match:
-                # Save previous choice if exists
-                if current_choice and current_text:
-                    choice_content = ' '.join(current_text).strip()
-                    if len(choice_content) > 3:
-                        choices[current_choice] = choice_content
-                
-                # Start new choice
-                current_choice = choice_match.group(1)
-                current_text = [choice_match.group(2)] if choice_match.group(2) else []
-            elif current_choice and line:
-                # Check if this line starts a new choice
-                if not re.match(r'^[A-D]\.', line):
-                    # Continue current choice text (multi-line choice)
-                    current_text.append(line)
-                # If it does start with a choice, we'll handle it in the next iteration
-        
-        # Don't forget the last choice
-        if current_choice and current_text:
-            choice_content = ' '.join(current_text).strip()
-            if len(choice_content) > 3:
-                choices[current_choice] = choice_content
-        
-        # Final cleanup
-        for letter in list(choices.keys()):
-            if choices[letter]:
-                # Remove any trailing patterns that might have been included
-                choices[letter] = re.sub(r'\s*[A-D]\.\s*.*$', '', choices[letter]).strip()
-                # Remove if too short
-                if len(choices[letter]) < 3:
-                    del choices[letter]
-        
-        return choices
-    
-    def extract_choices_from_raw_text(self, raw_text):
-        """Extract choices directly from raw OCR text (same logic as debug info)"""
-        choices = {}
-        
+    # Parsing is a pure function of the OCR text, so it is a cached static method:
+    # rerunning the script with the same OCR text is a cache lookup. st.cache_data
+    # rather than functools.lru_cache, because Streamlit re-executes this script (and
+    # so re-creates its functions and their caches) on every rerun.
+    
+    @staticmethod
+    @st.cache_data(max_entries=1024, show_spinner=False)
+    def process_question_text(raw_text):
+        """Parse OCR text into (question_text, explanation, choices, final_question, choice_labels), shared by all sessions"""
         if not raw_text:
-            return choices
-        
-        # Split by "Explanation:" to get only the question part
-        question_only = raw_text.split("Explanation:")[0].strip()
-        
-        # Split into lines for processing
-        lines = question_only.split('\n')
+            return None, None, {}, '', {}
         
-        # Look for lines that start with A., B., C., D.
-        current_choice = None
-        current_text = []
+        # Split by "Explanation:" once, to separate question from explanation
+        question_part, separator, explanation_part = raw_text.partition("Explanation:")
+        question_part = question_part.strip()
         
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check if line starts with a choice pattern
-            choice_match = re.match(r'^([A-D])\.\s*(.*)', line)
-            if choice_match:
-                # Save previous choice if exists
-                if current_choice and current_text:
-                    choice_content = ' '.join(current_text).strip()
-                    if len(choice_content) > 3:
-                        choices[current_choice] = choice_content
-                
-                # Start new choice
-                current_choice = choice_match.group(1)
-                current_text = [choice_match.group(2)] if choice_match.group(2) else []
-            elif current_choice and line:
-                # Check if this line starts a new choice
-                if not re.match(r'^[A-D]\.', line):
-                    # Continue current choice text (multi-line choice)
-                    current_text.append(line)
-        
-        # Don't forget the last choice
-        if current_choice and current_text:
-            choice_content = ' '.join(current_text).strip()
-            if len(choice_content) > 3:
-                choices[current_choice] = choice_content
-        
-        return choices
-    
-    def clean_question_text_ocr(self, question_text, choices):
-        """Remove choice options from question text to get clean question"""
-        clean_text = self.clean_ocr_text(question_text)
-        
-        # Remove page markers
-        clean_text = re.sub(r'--- Page \d+ ---[^\n]*\n?', '', clean_text)
-        
-        # Split into lines and remove choice lines
-        lines = clean_text.split('\n')
-        question_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Skip lines that start with choice patterns (A., B., C., D.)
-            if re.match(r'^[A-D]\.\s', line):
-                break  # Stop processing once we hit the first choice
-                
-            question_lines.append(line)
-        
-        # Join the remaining lines
-        clean_text = ' '.join(question_lines)
+        # Cleaned text for display and answer detection
+        question_text = StudyAppOCR.clean_ocr_text(question_part)
+        explanation = StudyAppOCR.clean_ocr_text(explanation_part) if separator else "No explanation available."
         
-        # Additional cleanup
-        clean_text = re.sub(r'\s+', ' ', clean_text)
-        clean_text = clean_text.strip()
+        # Question display text and choices, from a single pass over the question lines
+        question_lines, choices = _parse_question_and_choices(question_part)
+        final_question = ' '.join(' '.join(question_lines).split())
         
-        return clean_text
+        # Radio button label for each letter, in letter order
+        choice_labels = {letter: f"{letter}. {choices[letter]}" for letter in 'ABCD' if choices.get(letter)}
+        return question_text, explanation, choices, final_question, choice_labels
     
     def get_cached_question_data(self, pdf_path, question_number):
         """Get cached question data or extract it if not cached"""
-        cache_key = f"question_{question_number}"
-        
-        # Check if this question is already cached
-        if cache_key in st.session_state.question_data_cache:
-            cached_data = st.session_state.question_data_cache[cache_key]
-            return cached_data['raw_text'], cached_data['question_text'], cached_data['explanation'], cached_data['choices'], cached_data['final_question'], cached_data['correct_answer']
-        
-        # If not cached, extract the data with a progress indicator
-        with st.spinner(f"Processing Question {question_number} with OCR..."):
-            # Extract text using OCR
-            raw_text = self.extract_text_from_pdf_ocr(pdf_path)
-            if raw_text is None:
-                return None, None, None, None, None, None
-            
-            # Parse the data
-            question_text, explanation = self.parse_question_and_explanation(raw_text)
-            choices = self.extract_choices_from_raw_text(raw_text)
-            
-            # Process question display text
-            question_only = raw_text.split("Explanation:")[0].strip()
-            lines = question_only.split('\n')
-            question_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                if re.match(r'^[A-D]\.\s', line):
-                    break
-                question_lines.append(line)
-            
-            final_question = ' '.join(question_lines)
-            final_question = re.sub(r'\s+', ' ', final_question).strip()
-            
-            # Find the correct answer - first check stored answers, then auto-detect
-            stored_answer = self.get_stored_correct_answer(question_number)
-            if stored_answer:
-                correct_answer = stored_answer
-            else:
-                correct_answer = self.find_correct_answer(explanation)
-                # If we found an answer, store it
-                if correct_answer:
-                    self.store_correct_answer(question_number, correct_answer)
-            
-            # Cache the results
-            cached_data = {
-                'raw_text': raw_text,
-                'question_text': question_text,
-                'explanation': explanation,
-                'choices': choices,
-                'final_question': final_question,
-                'correct_answer': correct_answer
-            }
-            
-            st.session_state.question_data_cache[cache_key] = cached_data
-            
-        return cached_data['raw_text'], cached_data['question_text'], cached_data['explanation'], cached_data['choices'], cached_data['final_question'], cached_data['correct_answer']
+        # Use the saved OCR text when available, otherwise extract text using OCR and save it
+        raw_text = self.ocr_index.get(question_number, pdf_path)
+        if raw_text is None:
+            with st.spinner(f"Processing Question {question_number} with OCR..."):
+                # A background job that is already running is waited on rather than OCR the
+                # PDF twice; one still queued (possibly behind others) is cancelled and run here
+                future = _get_ocr_jobs()[0].get(question_number, (None, None))[1]
+                if future is not None and not future.cancel():
+                    future.result()
+                    raw_text = self.ocr_index.get(question_number, pdf_path)
+                if raw_text is None:
+                    raw_text = self.extract_text_from_pdf_ocr(pdf_path)
+                    if raw_text is not None:
+                        self.ocr_index.store(question_number, pdf_path, raw_text)
+        if raw_text is None:
+            return None, None, None, None, None, None, None
+        
+        # Parsing is cached on the OCR text, so it runs once per question per server process
+        question_text, explanation, choices, final_question, choice_labels = self.process_question_text(raw_text)
+        
+        # Find the correct answer - first check stored answers, then auto-detect
+        stored_answer = self.get_stored_correct_answer(question_number)
+        if stored_answer:
+            correct_answer = stored_answer
+        else:
+            correct_answer = self.find_correct_answer(explanation)
+            # If we found an answer, store it
+            if correct_answer:
+                self.store_correct_answer(question_number, correct_answer)
+        
+        return raw_text, question_text, explanation, choices, final_question, correct_answer, choice_labels
     
     def find_correct_answer(self, explanation):
         """Find the correct answer by analyzing which choices are marked as wrong in the explanation"""
@@ -376,29 +825,12 @@ class StudyAppOCR:
         all_choices = {'A', 'B', 'C', 'D'}
         wrong_choices = set()
         
-        # Patterns to find wrong choices in explanation
-        wrong_choice_patterns = [
-            r'\(Choice ([A-D])\)',
-            r'\(Choice ([A-D]) & ([A-D])\)',
-            r'\(Choice ([A-D]) & ([A-D]) & ([A-D])\)',
-            r'\(Choice ([A-D]), ([A-D]), & ([A-D])\)',
-            r'\(Choice ([A-D]), ([A-D]), and ([A-D])\)',
-            r'\(Choice ([A-D]) and ([A-D])\)',
-        ]
-        
-        # Find all wrong choices mentioned in the explanation
-        for pattern in wrong_choice_patterns:
-            matches = re.findall(pattern, explanation, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    # Multiple choices in one match
-                    for choice in match:
-                        if choice and choice in all_choices:
-                            wrong_choices.add(choice)
-                else:
-                    # Single choice
-                    if match in all_choices:
-                        wrong_choices.add(match)
+        # Find all wrong choices mentioned in the explanation, in a single scan
+        for match in _WRONG_CHOICE_RE.finditer(explanation):
+            for choice in _CHOICE_LIST_SEP_RE.split(match.group(1)):
+                choice = choice.strip().upper()
+                if choice in all_choices:
+                    wrong_choices.add(choice)
         
         # The correct choice is the one NOT mentioned as wrong
         correct_choices = all_choices - wrong_choices
@@ -414,27 +846,21 @@ class StudyAppOCR:
         if not username:
             return None
         # Create safe filename from username
-        safe_username = re.sub(r'[^\w\-_\.]', '_', username)
+        safe_username = _UNSAFE_FILENAME_CHARS_RE.sub('_', username)
         return f"user_answers_{safe_username}.json"
     
     def load_user_answers(self, answers_file):
-        """Load user answers from JSON file"""
-        if not answers_file or not os.path.exists(answers_file):
-            return {}
-        try:
-            with open(answers_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            st.error(f"Error loading user answers: {e}")
+        """User answers as {question_number: (correct_result, users_choice)}, read from disk once per server process"""
+        if not answers_file:
             return {}
+        return _get_answers_store(answers_file).data
     
-    def save_user_answers(self, answers_file, answers_data):
-        """Save user answers to JSON file"""
+    def save_user_answers(self, answers_file):
+        """Save user answers to JSON file (batched; see AnswersStore)"""
         if not answers_file:
             return
         try:
-            with open(answers_file, 'w', encoding='utf-8') as f:
-                json.dump(answers_data, f, indent=2, ensure_ascii=False)
+            _get_answers_store(answers_file).save()
         except Exception as e:
             st.error(f"Error saving user answers: {e}")
 
@@ -457,6 +883,7 @@ class StudyAppOCR:
                 if username.strip():
                     st.session_state.current_user = username.strip()
                     st.session_state.user_answers_file = self.get_user_answers_file(username.strip())
+                    st.session_state.status_cache = {}
                     st.success(f"✅ Logged in as: {username.strip()}")
                     st.rerun()
                 else:
@@ -470,9 +897,10 @@ class StudyAppOCR:
             if st.session_state.user_answers_file:
                 user_answers = self.load_user_answers(st.session_state.user_answers_file)
                 total_questions = self.get_total_questions()
-                answered_questions = len([q for q, data in user_answers.items() if data.get('Users_choice')])
-                correct_answers = len([q for q, data in user_answers.items() 
-                                     if data.get('Users_choice') == data.get('Correct_result')])
+                answered_questions = correct_answers = 0
+                for correct_result, users_choice in user_answers.values():
+                    answered_questions += bool(users_choice)
+                    correct_answers += users_choice == correct_result
                 
                 col1, col2, col3 = st.columns(3)
                 with col1:
@@ -490,13 +918,7 @@ class StudyAppOCR:
 
     def get_question_status_for_user(self, question_num, user_answers):
         """Get status for a specific question for the current user"""
-        question_key = f"Question_{question_num}"
-        if question_key not in user_answers:
-            return "🤔"  # Needs answer
-        
-        question_data = user_answers[question_key]
-        users_choice = question_data.get('Users_choice')
-        correct_result = question_data.get('Correct_result')
+        correct_result, users_choice = user_answers.get(question_num, (None, None))
         
         if not users_choice:
             return "🤔"  # Needs answer
@@ -505,22 +927,39 @@ class StudyAppOCR:
         else:
             return "❌"  # Wrong
 
+    def get_question_statuses(self, user_answers):
+        """Status of every question for the current user, cached in session state until an answer changes"""
+        statuses = st.session_state.status_cache
+        total_questions = self.get_total_questions()
+        if len(statuses) < total_questions:
+            statuses.update({question_num: self.get_question_status_for_user(question_num, user_answers)
+                             for question_num in range(1, total_questions + 1)
+                             if question_num not in statuses})
+        return statuses
+
+    def get_question_labels(self, user_answers):
+        """Labels for the question selector ("✅ Question 1", ...), rebuilt only when a status changes"""
+        labels = st.session_state.question_labels
+        total_questions = self.get_total_questions()
+        # Any answer change drops its entry from the status cache, so a full cache means nothing changed
+        if len(labels) != total_questions or len(st.session_state.status_cache) < total_questions:
+            question_statuses = self.get_question_statuses(user_answers)
+            labels = [f"{question_statuses[question_num]} Question {question_num}"
+                      for question_num in range(1, total_questions + 1)]
+            st.session_state.question_labels = labels
+        return labels
+
     def update_user_answer(self, question_num, user_choice, correct_answer=None):
         """Update user's answer in their personal JSON file"""
         if not st.session_state.user_answers_file:
             return
         
         user_answers = self.load_user_answers(st.session_state.user_answers_file)
-        question_key = f"Question_{question_num}"
-        
-        if question_key not in user_answers:
-            user_answers[question_key] = {}
+        correct_result = user_answers.get(question_num, (None, None))[0]
+        user_answers[question_num] = (correct_answer or correct_result, user_choice)
         
-        user_answers[question_key]["Users_choice"] = user_choice
-        if correct_answer:
-            user_answers[question_key]["Correct_result"] = correct_answer
-        
-        self.save_user_answers(st.session_state.user_answers_file, user_answers)
+        self.save_user_answers(st.session_state.user_answers_file)
+        st.session_state.status_cache.pop(question_num, None)
 
     def get_total_questions(self):
         """Get total number of questions available"""
@@ -531,84 +970,167 @@ class StudyAppOCR:
         pdf_name = os.path.basename(pdf_path)
         
         try:
-            with open(pdf_path, "rb") as pdf_file:
-                pdf_bytes = pdf_file.read()
-                
-                st.markdown(f"**📄 File:** `{pdf_name}`")
-                
-                # Option 1: Download button (most reliable across all browsers)
-                st.download_button(
-                    label="💾 Download PDF",
-                    data=pdf_bytes,
-                    file_name=pdf_name,
-                    mime="application/pdf",
-                    key=f"download_pdf_{question_number}",
-                    help="Most reliable option: Download and open in your PDF viewer",
-                    use_container_width=True
-                )
-                
-                st.markdown("---")
-                st.markdown("**🔍 Quick Preview Options:**")
-                
-                # Option 2: PDF as Images (most compatible for viewing)
-                if st.checkbox("🖼️ Show as Images", key=f"img_pdf_{question_number}", help="Convert PDF to images for viewing"):
-                    try:
-                        # Check if we have the conversion capability
-                        images = convert_from_path(pdf_path, dpi=150)
+            mtime = os.path.getmtime(pdf_path)
+            pdf_bytes = _read_pdf_bytes(pdf_path, mtime)
+            
+            st.markdown(f"**📄 File:** `{pdf_name}`")
+            
+            # Option 1: Download button (most reliable across all browsers)
+            st.download_button(
+                label="💾 Download PDF",
+                data=pdf_bytes,
+                file_name=pdf_name,
+                mime="application/pdf",
+                key=f"download_pdf_{question_number}",
+                help="Most reliable option: Download and open in your PDF viewer",
+                use_container_width=True
+            )
+            
+            st.markdown("---")
+            st.markdown("**🔍 Quick Preview Options:**")
+            
+            # Option 2: PDF as Images (most compatible for viewing)
+            if st.checkbox("🖼️ Show as Images", key=f"img_pdf_{question_number}", help="Convert PDF to images for viewing"):
+                try:
+                    # Cached, so toggling the preview or rerunning doesn't re-render the PDF
+                    for page, image in enumerate(_render_preview_pages(pdf_path, mtime), 1):
+                        st.image(image, caption=f"Page {page} of {pdf_name}", use_column_width=True)
                         
-                        for i, image in enumerate(images):
-                            st.image(image, caption=f"Page {i+1} of {pdf_name}", use_column_width=True)
-                            
-                    except Exception as e:
-                        st.error(f"Could not convert PDF to images: {str(e)}")
-                        st.info("💡 Please use the download button to view the PDF.")
+                except Exception as e:
+                    st.error(f"Could not convert PDF to images: {str(e)}")
+                    st.info("💡 Please use the download button to view the PDF.")
+            
+            # Option 3: Embedded viewer (may not work in all environments)
+            if st.checkbox("📖 Try Embedded Viewer", key=f"embed_pdf_{question_number}", help="May not work in all browsers/deployments"):
+                b64_pdf = _pdf_base64(pdf_path, mtime)
                 
-                # Option 3: Embedded viewer (may not work in all environments)
-                if st.checkbox("📖 Try Embedded Viewer", key=f"embed_pdf_{question_number}", help="May not work in all browsers/deployments"):
-                    b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-                    
-                    # More robust iframe approach
-                    st.markdown(f"""
-                    <div style="width: 100%; height: 500px; border: 2px solid #ddd; border-radius: 10px; overflow: hidden; background-color: #f8f9fa;">
-                        <object data="data:application/pdf;base64,{b64_pdf}" 
-                                type="application/pdf" 
-                                width="100%" 
-                                height="100%">
-                            <embed src="data:application/pdf;base64,{b64_pdf}" 
-                                   type="application/pdf" 
-                                   width="100%" 
-                                   height="100%">
-                                <div style="padding: 20px; text-align: center;">
-                                    <p style="color: #666;">📄 PDF cannot be displayed in this browser.</p>
-                                    <p style="color: #666;">Please use the download button above to view the PDF.</p>
-                                </div>
-                            </embed>
-                        </object>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.info("💡 If nothing appears above, your browser doesn't support embedded PDFs. Use the download option instead.")
+                # More robust iframe approach
+                st.markdown(f"""
+                <div style="width: 100%; height: 500px; border: 2px solid #ddd; border-radius: 10px; overflow: hidden; background-color: #f8f9fa;">
+                    <object data="data:application/pdf;base64,{b64_pdf}" 
+                            type="application/pdf" 
+                            width="100%" 
+                            height="100%">
+                        <embed src="data:application/pdf;base64,{b64_pdf}" 
+                               type="application/pdf" 
+                               width="100%" 
+                               height="100%">
+                            <div style="padding: 20px; text-align: center;">
+                                <p style="color: #666;">📄 PDF cannot be displayed in this browser.</p>
+                                <p style="color: #666;">Please use the download button above to view the PDF.</p>
+                            </div>
+                        </embed>
+                    </object>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                st.info("💡 If nothing appears above, your browser doesn't support embedded PDFs. Use the download option instead.")
+            
+            # Option 4: Direct link (backup)
+            if st.checkbox("🔗 Direct Link Method", key=f"link_pdf_{question_number}", help="Alternative link-based approach"):
+                b64_pdf = _pdf_base64(pdf_path, mtime)
+                pdf_data_url = f"data:application/pdf;base64,{b64_pdf}"
                 
-                # Option 4: Direct link (backup)
-                if st.checkbox("🔗 Direct Link Method", key=f"link_pdf_{question_number}", help="Alternative link-based approach"):
-                    b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-                    pdf_data_url = f"data:application/pdf;base64,{b64_pdf}"
-                    
-                    st.markdown(f"""
-                    <a href="{pdf_data_url}" target="_blank" 
-                       style="display: inline-block; background-color: #007bff; color: white; 
-                       padding: 12px 24px; text-decoration: none; border-radius: 8px; 
-                       font-weight: bold; margin: 5px;">
-                        🌐 Open in New Tab
-                    </a>
-                    """, unsafe_allow_html=True)
-                    
-                    st.warning("⚠️ This method may show 'about:blank' in some browsers or deployment environments.")
+                st.markdown(f"""
+                <a href="{pdf_data_url}" target="_blank" 
+                   style="display: inline-block; background-color: #007bff; color: white; 
+                   padding: 12px 24px; text-decoration: none; border-radius: 8px; 
+                   font-weight: bold; margin: 5px;">
+                    🌐 Open in New Tab
+                </a>
+                """, unsafe_allow_html=True)
                 
+                st.warning("⚠️ This method may show 'about:blank' in some browsers or deployment environments.")
+            
         except Exception as e:
             st.error(f"Error loading PDF: {str(e)}")
             st.info("The PDF file might be corrupted or inaccessible.")
 
+def show_progress(question_number, total_questions):
+    """Progress bar and position within the question set"""
+    st.subheader("📊 Progress")
+    st.progress(question_number / total_questions)
+    st.write(f"Question {question_number} of {total_questions}")
+
+def show_debug_info(question_number, text, question_text, choices):
+    """Raw OCR text and parse results for a question that failed to parse"""
+    # Behind a toggle rather than a collapsed expander, whose contents (the whole page
+    # of OCR text) would still be sent to the browser on every rerun. Keyed per question,
+    # so it starts off again on the next one.
+    if st.toggle("Show debug info", key=f"show_debug_{question_number}"):
+        st.write("Raw OCR text:")
+        st.text(text)
+        st.write("Question text:")
+        st.text(question_text)
+        st.write("Extracted choices:")
+        st.write(choices)
+
+@st.fragment
+def answer_fragment(app, question_number, choice_labels, correct_answer, explanation, user_answers):
+    """Answer choices with the Submit and Show Explanation buttons; picking a choice, or
+    showing the explanation of an answer already submitted, reruns only this part of the page"""
+    # The options are the letters themselves, so the selection is the answer (A, B, C, or D)
+    selected_choice = st.radio(
+        "Choose one:",
+        list(choice_labels),
+        index=None,  # No pre-selection
+        format_func=choice_labels.__getitem__,
+        key=f"question_{question_number}_choice"
+    )
+    
+    if selected_choice:
+        st.session_state.user_answer = selected_choice
+    
+    # Submit and Show Explanation buttons (separate section)
+    if st.session_state.user_answer:
+        # Check if already submitted in user's personal file
+        already_submitted = user_answers.get(question_number, (None, None))[1]
+        
+        st.markdown("---")  # Add separator
+        st.subheader("📝 Submit & Review")
+        
+        action_col1, action_col2 = st.columns([1, 1])
+        
+        with action_col1:
+            if already_submitted:
+                submit_clicked = st.button("🔄 Update Answer", key="submit_answer_btn", type="secondary", use_container_width=True)
+            else:
+                submit_clicked = st.button("📝 Submit Answer", key="submit_answer_btn", type="primary", use_container_width=True)
+            
+            if submit_clicked:
+                app.update_user_answer(question_number, st.session_state.user_answer, correct_answer)
+                # Show success message and refresh
+                if already_submitted:
+                    st.success("✅ Answer updated!", icon="✅")
+                else:
+                    st.success("✅ Answer submitted!", icon="✅")
+                # The sidebar status icons are outside this fragment, so rerun the whole page
+                st.rerun()
+        
+        with action_col2:
+            if st.button("📖 Show Explanation", key="show_explanation_btn", use_container_width=True):
+                st.session_state.show_explanation = True
+                # Auto-submit if not already submitted; that changes the sidebar status, which is
+                # outside this fragment, so rerun the whole page as Submit does
+                if not already_submitted:
+                    app.update_user_answer(question_number, st.session_state.user_answer, correct_answer)
+                    st.rerun()
+        
+        if st.session_state.show_explanation:
+            # Show if the answer is correct or not
+            if correct_answer and st.session_state.user_answer == correct_answer:
+                st.success(f"🎉 Correct! You selected: **{st.session_state.user_answer}**", icon="✅")
+            elif correct_answer:
+                st.error(f"❌ Incorrect. You selected: **{st.session_state.user_answer}**. The correct answer is: **{correct_answer}**", icon="❌")
+            else:
+                st.info(f"You selected: **{st.session_state.user_answer}** (Could not determine correct answer)", icon="ℹ️")
+            
+            st.subheader("📝 Explanation:")
+            # Add correct answer indication to explanation
+            if correct_answer:
+                st.info(f"**Correct Answer: {correct_answer}**", icon="🎯")
+            st.markdown(explanation)
+
 def main():
     st.set_page_config(
         page_title="Law Study Tool (OCR)",
@@ -634,18 +1156,6 @@ def main():
     
     st.markdown("---")
     
-    # Initialize session state variables
-    if 'current_question_index' not in st.session_state:
-        st.session_state.current_question_index = 0
-    if 'user_answer' not in st.session_state:
-        st.session_state.user_answer = None
-    if 'show_explanation' not in st.session_state:
-        st.session_state.show_explanation = False
-    if 'ocr_cache' not in st.session_state:
-        st.session_state.ocr_cache = {}
-    if 'question_data_cache' not in st.session_state:
-        st.session_state.question_data_cache = {}
-    
     # Sidebar for navigation
     st.sidebar.header("📋 Question Navigation")
     
@@ -654,19 +1164,17 @@ def main():
     total_questions = len(app.pdf_files)
     st.sidebar.write(f"Total Questions: {total_questions}")
     
-    # Show statistics for current user
+    # Show statistics for current user, tallied in one pass over the answered questions
     correct_count = 0
-    wrong_count = 0
-    needs_answer_count = 0
-    
-    for i in range(total_questions):
-        status = app.get_question_status_for_user(i + 1, user_answers)
-        if status == '✅':
-            correct_count += 1
-        elif status == '❌':
-            wrong_count += 1
-        else:
-            needs_answer_count += 1
+    wrong_numbers = []
+    for question_num, (correct_result, users_choice) in user_answers.items():
+        if users_choice and question_num <= total_questions:
+            if users_choice == correct_result:
+                correct_count += 1
+            else:
+                wrong_numbers.append(question_num)
+    wrong_count = len(wrong_numbers)
+    needs_answer_count = total_questions - correct_count - wrong_count
     
     st.sidebar.metric("✅ Correct", correct_count)
     st.sidebar.metric("❌ Wrong", wrong_count)
@@ -676,10 +1184,7 @@ def main():
     if wrong_count > 0:
         st.sidebar.markdown("---")
         st.sidebar.markdown("### ❌ Review Wrong Answers")
-        wrong_questions = []
-        for i in range(total_questions):
-            if app.get_question_status_for_user(i + 1, user_answers) == '❌':
-                wrong_questions.append(f"Question {i + 1}")
+        wrong_questions = [f"Question {question_num}" for question_num in sorted(wrong_numbers)]
         
         if wrong_questions:
             selected_wrong = st.sidebar.selectbox(
@@ -698,34 +1203,59 @@ def main():
     # Show answer summary (expandable)
     if correct_count + wrong_count > 0:
         with st.sidebar.expander("📊 View All Results"):
-            for question_key in sorted(user_answers.keys(), key=lambda x: int(x.split('_')[1])):
-                q_num = question_key.split('_')[1]
-                correct_answer = user_answers[question_key].get("Correct_result")
-                user_choice = user_answers[question_key].get("Users_choice")
+            # One markdown element for all results rather than one alert box per question
+            result_lines = []
+            for q_num in sorted(user_answers):
+                correct_answer, user_choice = user_answers[q_num]
                 if correct_answer and user_choice:
                     if correct_answer == user_choice:
-                        st.success(f"Q{q_num}: {user_choice} ✓")
+                        result_lines.append(f":green[Q{q_num}: {user_choice} ✓]")
                     else:
-                        st.error(f"Q{q_num}: {user_choice} (Correct: {correct_answer})")
+                        result_lines.append(f":red[Q{q_num}: {user_choice} (Correct: {correct_answer})]")
+            if result_lines:
+                st.markdown("  \n".join(result_lines))
     
     st.sidebar.markdown("---")
     
     # Question selector in sidebar with status indicators
-    question_options = []
-    for i in range(total_questions):
-        question_num = i + 1
-        status = app.get_question_status_for_user(question_num, user_answers)
-        question_options.append(f"{status} Question {question_num}")
-    selected_question = st.sidebar.selectbox(
-        "Jump to Question:",
-        question_options,
-        index=st.session_state.current_question_index
-    )
+    question_options = app.get_question_labels(user_answers)
+    current_index = st.session_state.current_question_index
+    if total_questions > PAGED_SELECTOR_THRESHOLD:
+        # Only send one page of options to the browser. Changing the page only browses;
+        # nothing changes until a question on it is picked.
+        page_count = (total_questions + QUESTIONS_PER_PAGE - 1) // QUESTIONS_PER_PAGE
+        current_page = current_index // QUESTIONS_PER_PAGE + 1
+        if st.session_state.question_page_index != current_index:
+            # The current question moved (Next/Previous, wrong-answer review), so show its page
+            st.session_state.question_page_index = current_index
+            st.session_state.question_page = current_page
+        # Streamlit drops a widget's state while it isn't drawn, and the page count can shrink
+        st.session_state.question_page = min(st.session_state.get('question_page', current_page), page_count)
+        page = st.sidebar.number_input(
+            "Page",
+            min_value=1,
+            max_value=page_count,
+            key="question_page"
+        )
+        page_start = (page - 1) * QUESTIONS_PER_PAGE
+        page_indices = range(page_start, min(page_start + QUESTIONS_PER_PAGE, total_questions))
+        selected_number = st.sidebar.selectbox(
+            "Jump to Question:",
+            page_indices,
+            index=current_index - page_start if current_index in page_indices else None,
+            format_func=question_options.__getitem__,
+            placeholder="Pick a question on this page"
+        )
+    else:
+        selected_number = st.sidebar.selectbox(
+            "Jump to Question:",
+            range(total_questions),
+            index=current_index,
+            format_func=question_options.__getitem__
+        )
     
-    # Update current question index based on selection
-    # Extract question number from the selected option (e.g., "✅ Question 1" -> 0)
-    selected_number = int(selected_question.split("Question ")[1]) - 1
-    if selected_number != st.session_state.current_question_index:
+    # The options are question indices, so the selection needs no parsing
+    if selected_number is not None and selected_number != st.session_state.current_question_index:
         st.session_state.current_question_index = selected_number
         st.session_state.user_answer = None
         st.session_state.show_explanation = False
@@ -741,13 +1271,14 @@ def main():
         st.error("Failed to load the current question.")
         return
     
-    text, question_text, explanation, choices, final_question, correct_answer = cached_result
+    text, question_text, explanation, choices, final_question, correct_answer, choice_labels = cached_result
     
-    # Progress section
-    st.subheader("📊 Progress")
-    progress = (st.session_state.current_question_index + 1) / total_questions
-    st.progress(progress)
-    st.write(f"Question {st.session_state.current_question_index + 1} of {total_questions}")
+    # Start OCR for the neighbouring questions while the user works on this one
+    app.prefetch_questions(st.session_state.current_question_index)
+    
+    # Progress section: its place at the top is reserved now, but it is filled in
+    # after the question and choices so that they reach the browser first
+    progress_section = st.container()
     
     st.markdown("---")
     
@@ -759,99 +1290,25 @@ def main():
         st.write(final_question)
     else:
         st.error("Could not parse the question text.")
+        with progress_section:
+            show_progress(question_number, total_questions)
         return
     
     # Display choices and get user selection
     if choices and len(choices) >= 2:  # At least 2 choices found
         st.subheader("Select your answer:")
         
-        choice_options = []
-        for letter in ['A', 'B', 'C', 'D']:
-            if letter in choices and choices[letter]:
-                choice_options.append(f"{letter}. {choices[letter]}")
-        
-        if choice_options:
-            selected_choice = st.radio(
-                "Choose one:",
-                choice_options,
-                index=None,  # No pre-selection
-                key=f"question_{question_number}_choice"
-            )
-            
-            if selected_choice:
-                st.session_state.user_answer = selected_choice[0]  # Extract letter (A, B, C, or D)
+        if choice_labels:
+            answer_fragment(app, question_number, choice_labels, correct_answer, explanation, user_answers)
         else:
             st.error("Could not extract answer choices from this question.")
-            # Debug information
-            with st.expander("Debug Info (Click to expand)"):
-                st.write("Raw OCR text:")
-                st.text(text)
-                st.write("Question text:")
-                st.text(question_text)
-                st.write("Extracted choices:")
-                st.write(choices)
+            show_debug_info(question_number, text, question_text, choices)
     else:
         st.error("No answer choices found in this question.")
-        # Debug information
-        with st.expander("Debug Info (Click to expand)"):
-            st.write("Raw OCR text:")
-            st.text(text)
-            st.write("Question text:")
-            st.text(question_text)
-            st.write("Extracted choices:")
-            st.write(choices)
-        
-    # Submit and Show Explanation buttons (separate section)
-    if st.session_state.user_answer:
-        # Check if already submitted in user's personal file
-        question_key = f"Question_{question_number}"
-        already_submitted = user_answers.get(question_key, {}).get('Users_choice')
-        
-        st.markdown("---")  # Add separator
-        st.subheader("📝 Submit & Review")
-        
-        action_col1, action_col2 = st.columns([1, 1])
-        
-        with action_col1:
-            if already_submitted:
-                submit_clicked = st.button("🔄 Update Answer", key="submit_answer_btn", type="secondary", use_container_width=True)
-            else:
-                submit_clicked = st.button("📝 Submit Answer", key="submit_answer_btn", type="primary", use_container_width=True)
-            
-            if submit_clicked:
-                app.update_user_answer(question_number, st.session_state.user_answer, correct_answer)
-                # Force sidebar refresh by updating session state
-                if 'sidebar_refresh' not in st.session_state:
-                    st.session_state.sidebar_refresh = 0
-                st.session_state.sidebar_refresh += 1
-                # Show success message and refresh
-                if already_submitted:
-                    st.success("✅ Answer updated!", icon="✅")
-                else:
-                    st.success("✅ Answer submitted!", icon="✅")
-                st.rerun()
-        
-        with action_col2:
-            if st.button("📖 Show Explanation", key="show_explanation_btn", use_container_width=True):
-                # Auto-submit if not already submitted
-                if not already_submitted:
-                    app.update_user_answer(question_number, st.session_state.user_answer, correct_answer)
-                st.session_state.show_explanation = True
-        
-        if st.session_state.show_explanation:
-            # Show if the answer is correct or not
-            if correct_answer and st.session_state.user_answer == correct_answer:
-                st.success(f"🎉 Correct! You selected: **{st.session_state.user_answer}**", icon="✅")
-            elif correct_answer:
-                st.error(f"❌ Incorrect. You selected: **{st.session_state.user_answer}**. The correct answer is: **{correct_answer}**", icon="❌")
-            else:
-                st.info(f"You selected: **{st.session_state.user_answer}** (Could not determine correct answer)", icon="ℹ️")
-            
-            st.subheader("📝 Explanation:")
-            # Add correct answer indication to explanation
-            if correct_answer:
-                st.info(f"**Correct Answer: {correct_answer}**", icon="🎯")
-            st.markdown(explanation)
+        show_debug_info(question_number, text, question_text, choices)
+    
+    with progress_section:
+        show_progress(question_number, total_questions)
         
     # Manual correct answer input for questions where auto-detection failed
     if not correct_answer:
@@ -874,9 +1331,6 @@ def main():
                 app.store_correct_answer(question_number, manual_answer)
                 app.update_user_answer(question_number, st.session_state.user_answer if st.session_state.user_answer else None, manual_answer)
                 st.success(f"✅ Saved: {manual_answer}", icon="✅")
-                # Update the cached data
-                if f"question_{question_number}" in st.session_state.question_data_cache:
-                    st.session_state.question_data_cache[f"question_{question_number}"]["correct_answer"] = manual_answer
                 st.rerun()
     
     # Navigation section